@@ -102,6 +102,27 @@ def test_tiddler_racing():
     store.delete(Bag('foo'))
     store.delete(Bag('bar'))
 
+def test_add_leaves_tiddler_alone():
+    bag = Bag('untouched')
+    store.put(bag)
+    tiddler = Tiddler('one', 'untouched')
+    tiddler.text = u'some text'
+    store.put(tiddler)
+    stored_memory = config.get('collections.use_memory')
+    config['collections.use_memory'] = False
+    try:
+        reference = Tiddler('one', 'untouched')
+        Tiddlers(store=store).add(reference)
+        assert reference.store is None
+        assert reference.text == ''
+
+        tiddlers = Tiddlers(store=store)
+        tiddlers.add_references([reference])
+        assert [tiddler.text for tiddler in tiddlers] == ['some text']
+    finally:
+        config['collections.use_memory'] = stored_memory
+        store.delete(bag)
+
 def test_tiddlers_container():
     tiddlers = Tiddlers()
 
@@ -117,3 +138,33 @@ def test_tiddlers_container():
     tiddlers = Tiddlers(recipe='foobar')
     assert tiddlers.recipe == 'foobar'
     assert not tiddlers.bag
+
+def test_tiddlers_prefetch():
+    bag = Bag('prefetch')
+    store.put(bag)
+    titles = ['tiddler%s' % index for index in range(20)]
+    for title in titles:
+        tiddler = Tiddler(title, 'prefetch')
+        tiddler.text = title
+        store.put(tiddler)
+    stored_threads = config.get('collections.prefetch_threads')
+    stored_window = config.get('collections.prefetch_window')
+    stored_memory = config.get('collections.use_memory')
+    config['collections.use_memory'] = False
+    config['collections.prefetch_threads'] = 4
+    config['collections.prefetch_window'] = 3
+    try:
+        tiddlers = Tiddlers(store=store)
+        for title in titles:
+            tiddlers.add(Tiddler(title, 'prefetch'))
+        store.delete(Tiddler('tiddler5', 'prefetch'))
+
+        loaded = list(tiddlers)
+        assert [tiddler.text for tiddler in loaded] == [title
+                for title in titles if title != 'tiddler5']
+        assert loaded[0].store
+    finally:
+        config['collections.prefetch_threads'] = stored_threads
+        config['collections.prefetch_window'] = stored_window
+        config['collections.use_memory'] = stored_memory
+        store.delete(bag)
@@ -9,8 +9,9 @@ from tiddlyweb.config import config
 from tiddlyweb.store import Store, NoBagError
 from tiddlyweb.control import (determine_bag_for_tiddler,
         get_tiddlers_from_recipe, determine_bag_from_recipe,
-        readable_tiddlers_by_bag)
+        readable_tiddlers_by_bag, policy_context)
 from tiddlyweb.model.bag import Bag
+from tiddlyweb.model.policy import ForbiddenError
 from tiddlyweb.model.recipe import Recipe
 from tiddlyweb.model.tiddler import Tiddler
 
@@ -125,3 +126,69 @@ def test_readable_tiddlers_by_bag():
     readable = list(readable_tiddlers_by_bag(store, tiddlers, usersign))
     assert (['tiddler3', 'tiddler6', 'tiddler7'] ==
             [tiddler.title for tiddler in readable])
+
+
+def test_determine_bag_from_recipe_existence():
+    exists_environ = {'tiddlyweb.config': dict(config)}
+    exists_environ['tiddlyweb.config'].pop('indexer', None)
+    exists_environ['tiddlyweb.store'] = store
+    store.put(Bag('existsone'))
+    store.put(Bag('existstwo'))
+    store.put(Tiddler('lonely', 'existsone'))
+    recipe = Recipe('exists')
+    recipe.set_recipe([('existsone', ''), ('existstwo', '')])
+    recipe.store = store
+
+    def _list_bag_tiddlers(bag):
+        raise AssertionError('bag listed')
+
+    store.storage.list_bag_tiddlers = _list_bag_tiddlers
+    try:
+        bag = determine_bag_from_recipe(recipe, Tiddler('lonely'),
+                exists_environ)
+        assert bag.name == 'existsone'
+        py.test.raises(NoBagError, 'determine_bag_from_recipe(recipe, '
+                'Tiddler("missing"), exists_environ)')
+    finally:
+        del store.storage.list_bag_tiddlers
+
+
+def test_policy_context():
+    context_environ = {'tiddlyweb.config': config, 'tiddlyweb.store': store}
+    store.environ = context_environ
+    bag = Bag('contextread')
+    bag.policy.read = ['cdent']
+    store.put(bag)
+    loaded = []
+    bag_get = store.storage.bag_get
+
+    def _bag_get(bag):
+        loaded.append(bag.name)
+        return bag_get(bag)
+
+    store.storage.bag_get = _bag_get
+    try:
+        context = policy_context(context_environ)
+        assert context is policy_context(context_environ)
+        cdent = {'name': 'cdent', 'roles': []}
+        fnd = {'name': 'fnd', 'roles': []}
+        assert context.allows('contextread', cdent, 'read')
+        py.test.raises(ForbiddenError,
+                "context.allows('contextread', fnd, 'read')")
+        py.test.raises(ForbiddenError,
+                "context.allows('contextread', fnd, 'read')")
+        assert context.user_perms('contextread', cdent) == ['read', 'write',
+                'create', 'delete']
+        assert context.user_perms('contextread', fnd) == ['write', 'create',
+                'delete']
+        py.test.raises(NoBagError, "context.bag('contextmissing')")
+        py.test.raises(NoBagError, "context.bag('contextmissing')")
+        assert loaded == ['contextread', 'contextmissing']
+
+        bag.policy.read = ['fnd']
+        store.put(bag)
+        assert context.allows('contextread', fnd, 'read')
+        assert loaded == ['contextread', 'contextmissing', 'contextread']
+    finally:
+        del store.storage.bag_get
+        store.environ = environ
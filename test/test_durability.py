@@ -0,0 +1,80 @@
+"""
+Test the durability settings of the text store.
+"""
+
+import threading
+
+from fixtures import reset_textstore
+
+from tiddlyweb.config import config
+from tiddlyweb.model.bag import Bag
+from tiddlyweb.model.tiddler import Tiddler
+from tiddlyweb.store import Store, StoreError
+import tiddlyweb.util
+from tiddlyweb.util import SyncGroup
+
+import py.test
+
+
+def setup_module(module):
+    reset_textstore()
+    module.synced = []
+    module.original_sync_file = tiddlyweb.util.sync_file
+
+    def sync_file(filename):
+        synced.append(filename)
+    tiddlyweb.util.sync_file = sync_file
+
+
+def teardown_module(module):
+    tiddlyweb.util.sync_file = module.original_sync_file
+
+
+def _store(durability):
+    return Store('text', {'store_root': 'store', 'durability': durability},
+            environ={'tiddlyweb.config': config})
+
+
+def test_unknown_durability():
+    py.test.raises(StoreError, "_store('sometimes')")
+
+
+def test_none():
+    store = _store('none')
+    store.put(Bag('durable'))
+    tiddler = Tiddler('one', 'durable')
+    tiddler.text = u'one'
+    store.put(tiddler)
+    store.flush()
+    assert store.get(Tiddler('one', 'durable')).text == 'one'
+
+
+def test_group():
+    store = _store('group')
+    assert store.storage._sync_group is _store('group').storage._sync_group
+    for title in ['two', 'three']:
+        tiddler = Tiddler(title, 'durable')
+        tiddler.text = title
+        store.put(tiddler)
+    del synced[:]
+    store.flush()
+    # revision, revision metadata and the bag manifest
+    assert len(synced) == 5
+    assert len([filename for filename in synced
+        if filename.endswith('manifest')]) == 1
+    store.flush()
+    assert len(synced) == 5
+
+
+def test_group_shared_flush():
+    del synced[:]
+    group = SyncGroup(0.05)
+    flushers = []
+    for number in range(5):
+        group.add('file%s' % number)
+        flushers.append(threading.Thread(target=group.flush))
+    for flusher in flushers:
+        flusher.start()
+    for flusher in flushers:
+        flusher.join()
+    assert sorted(synced) == ['file%s' % number for number in range(5)]
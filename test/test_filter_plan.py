@@ -0,0 +1,145 @@
+"""
+Test the planning of filter execution: select ordering,
+merged sort and limit, and filtering by the store.
+"""
+
+from fixtures import reset_textstore
+
+from tiddlyweb.config import config
+from tiddlyweb.control import _filter_tiddlers_from_bag
+from tiddlyweb.filters import (parse_for_filters, recursive_filter,
+        _order_selects, _merge_sort_limit)
+from tiddlyweb.filters.sort import sort_limit
+from tiddlyweb.model.bag import Bag
+from tiddlyweb.model.collections import Tiddlers
+from tiddlyweb.model.tiddler import Tiddler
+from tiddlyweb.store import Store
+from tiddlyweb.stores.text import Store as TextStore
+from tiddlyweb.web.sendtiddlers import _filter_tiddlers
+
+
+class FilteringStore(TextStore):
+    """
+    A text store which does select=tag: filters itself.
+    """
+
+    filtered = []
+
+    def filter_bag_tiddlers(self, bag, filters):
+        consumed = 0
+        tiddlers = self.list_bag_tiddlers(bag)
+        for key, argument in filters:
+            if key != 'select' or not argument.startswith('tag:'):
+                break
+            tag = argument.split(':', 1)[1]
+            tiddlers = [tiddler for tiddler in tiddlers
+                    if tag in self.tiddler_get(tiddler).tags]
+            consumed += 1
+        self.filtered.append(filters[:consumed])
+        return [Tiddler(tiddler.title, tiddler.bag)
+                for tiddler in tiddlers], consumed
+
+
+def setup_module(module):
+    reset_textstore()
+    module.environ = {'tiddlyweb.config': config}
+    module.store = Store(config['server_store'][0],
+            config['server_store'][1], environ=module.environ)
+    module.environ['tiddlyweb.store'] = module.store
+    module.store.put(Bag('planned'))
+    for number in range(8):
+        tiddler = Tiddler('t%s' % number, 'planned')
+        tiddler.text = number % 2 and u'odd text' or u'even text'
+        tiddler.tags = number % 2 and ['odd'] or ['even']
+        tiddler.modified = u'2010010%s' % number
+        store.put(tiddler)
+
+
+def _keys(filters):
+    return [argument for _, (key, argument), _ in filters]
+
+
+def test_order_selects():
+    filters, _ = parse_for_filters('select=text:odd;select=tag:!even;'
+            'select=modified:>2010;select=tag:odd;select=title:t1;'
+            'sort=title;select=text:odd;select=title:t3', environ)
+    assert _keys(_order_selects(filters)) == ['title:t1', 'tag:odd',
+            'modified:>2010', 'tag:!even', 'text:odd', 'title',
+            'title:t3', 'text:odd']
+
+
+def test_merge_sort_limit():
+    filters, _ = parse_for_filters('sort=-modified;limit=1,2;limit=1',
+            environ)
+    planned = _merge_sort_limit(filters)
+    assert [spec for _, spec, _ in planned] == [
+            ('sort_limit', '-modified,1,2'), ('limit', '1')]
+
+
+def test_planned_results_unchanged():
+    tiddlers = list(store.list_bag_tiddlers(Bag('planned')))
+    for filter_string in [
+            'select=text:odd;select=title:t3',
+            'select=tag:!even;sort=-modified;limit=2',
+            'sort=title;limit=2,3;select=text:even',
+            'sort=modified;limit=0']:
+        filters, _ = parse_for_filters(filter_string, environ)
+        planned = [tiddler.title for tiddler
+                in recursive_filter(filters, tiddlers)]
+        unplanned = tiddlers
+        for active_filter, _, filter_environ in filters:
+            unplanned = active_filter(unplanned, False, filter_environ)
+        assert planned == [tiddler.title for tiddler in unplanned]
+
+
+def test_sort_limit():
+    tiddlers = store.list_bag_tiddlers(Bag('planned'))
+    titles = [tiddler.title for tiddler in
+            sort_limit('modified', tiddlers, 1, 3, reverse=True,
+                environ=environ)]
+    assert titles == ['t6', 't5', 't4']
+
+
+def test_store_filters_bag():
+    filtering_store = Store(config['server_store'][0],
+            config['server_store'][1], environ=environ)
+    filtering_store.storage = FilteringStore(config['server_store'][1],
+            environ)
+    filter_environ = dict(environ)
+    filter_environ['tiddlyweb.store'] = filtering_store
+    bag = Bag('planned')
+    bag.store = filtering_store
+
+    tiddlers = _filter_tiddlers_from_bag(bag,
+            'select=text:odd;select=tag:odd;sort=-title;limit=2',
+            environ=filter_environ)
+    assert [tiddler.title for tiddler in tiddlers] == ['t7', 't5']
+    # the tag select, which the store can do, was moved first
+    assert FilteringStore.filtered[-1] == [('select', 'tag:odd')]
+
+
+def test_send_partial_bag_collection():
+    filtering_store = Store(config['server_store'][0],
+            config['server_store'][1], environ=environ)
+    filtering_store.storage = FilteringStore(config['server_store'][1],
+            environ)
+    filter_environ = dict(environ)
+    filter_environ['tiddlyweb.store'] = filtering_store
+    filters, _ = parse_for_filters('select=tag:odd', filter_environ)
+
+    # a collection of some of the tiddlers of a bag, for display
+    tiddlers = Tiddlers(store=filtering_store, bag='planned')
+    for title in ['t1', 't2', 't3']:
+        tiddlers.add(Tiddler(title, 'planned'))
+    del FilteringStore.filtered[:]
+    filtered = _filter_tiddlers(filters, filtering_store, tiddlers)
+    assert [tiddler.title for tiddler in filtered] == ['t1', 't3']
+    assert FilteringStore.filtered == []
+
+    bag = Bag('planned')
+    bag.store = filtering_store
+    filtered = _filter_tiddlers(filters, filtering_store, tiddlers,
+            indexable=bag)
+    assert sorted(tiddler.title for tiddler in filtered) == ['t1', 't3',
+            't5', 't7']
+    assert FilteringStore.filtered == [[('select', 'tag:odd')]]
@@ -0,0 +1,201 @@
+"""
+Test the SQLite filter indexer.
+"""
+
+import sqlite3
+
+import py.test
+
+from fixtures import reset_textstore
+
+from tiddlyweb.config import config
+from tiddlyweb.control import determine_bag_from_recipe
+from tiddlyweb.filters import (FilterIndexRefused, parse_for_filters,
+        recursive_filter)
+from tiddlyweb.indexer import index_query, init, get_index
+from tiddlyweb.model.bag import Bag
+from tiddlyweb.model.recipe import Recipe
+from tiddlyweb.model.tiddler import Tiddler
+from tiddlyweb.store import Store
+
+
+def setup_module(module):
+    reset_textstore()
+    module.index_config = dict(config)
+    module.index_config['indexer'] = 'tiddlyweb.indexer'
+    module.index_config['indexer.path'] = 'store/index.db'
+    init(module.index_config)
+    module.environ = {'tiddlyweb.config': module.index_config}
+    module.store = Store(config['server_store'][0],
+            config['server_store'][1], environ=module.environ)
+    module.environ['tiddlyweb.store'] = module.store
+    module.store.put(Bag('indexed'))
+    module.store.put(Bag('other'))
+    _put('one', 'indexed', tags=['alpha', 'beta'], modifier='cdent',
+            fields={'colour': 'red'})
+    _put('two', 'indexed', tags=['beta'], modifier='fnd',
+            fields={'colour': 'blue'})
+    _put('three', 'other', tags=['alpha'], modifier='cdent')
+
+
+def _put(title, bag, tags=None, modifier=None, fields=None):
+    tiddler = Tiddler(title, bag)
+    tiddler.text = u'hello'
+    tiddler.tags = tags or []
+    tiddler.modifier = modifier
+    tiddler.fields = fields or {}
+    store.put(tiddler)
+
+
+def _query(**kwords):
+    return sorted(tiddler.title for tiddler in index_query(environ, **kwords))
+
+
+def test_equality_queries():
+    assert _query(bag='indexed', tag='beta') == ['one', 'two']
+    assert _query(bag='indexed', tag='alpha') == ['one']
+    assert _query(bag='indexed', modifier='fnd') == ['two']
+    assert _query(bag='indexed', title='two') == ['two']
+    assert _query(bag='indexed', colour='red') == ['one']
+    assert _query(bag='indexed') == ['one', 'two']
+    assert _query(id='indexed:one') == ['one']
+    assert _query(id='indexed:nothere') == []
+    assert _query(bag='other', tag='alpha') == ['three']
+
+
+def test_results_are_loaded():
+    tiddler = list(index_query(environ, bag='indexed', tag='alpha'))[0]
+    assert tiddler.text == 'hello'
+    assert tiddler.fields['colour'] == 'red'
+
+
+def test_hooks_update_index():
+    _put('four', 'indexed', tags=['alpha'])
+    assert _query(bag='indexed', tag='alpha') == ['four', 'one']
+
+    _put('four', 'indexed', tags=['gamma'])
+    assert _query(bag='indexed', tag='alpha') == ['one']
+    assert _query(bag='indexed', tag='gamma') == ['four']
+
+    store.delete(Tiddler('four', 'indexed'))
+    assert _query(bag='indexed', tag='gamma') == []
+
+    store.delete(Bag('other'))
+    index = get_index(index_config)
+    assert not index._bag_indexed(index._connection(), 'other')
+
+
+def test_refused_queries():
+    py.test.raises(FilterIndexRefused,
+            "index_query(environ, bag='indexed', text='hello')")
+    py.test.raises(FilterIndexRefused,
+            "index_query(environ, bag='indexed', modified='20090101')")
+    py.test.raises(FilterIndexRefused,
+            "index_query(environ, tag='alpha')")
+    py.test.raises(FilterIndexRefused,
+            "index_query(environ, bag='indexed', tag='a', modifier='b')")
+
+
+def test_select_filter_uses_index():
+    filters, _ = parse_for_filters('select=tag:beta;sort=title', environ)
+    tiddlers = recursive_filter(filters, [], indexable=Bag('indexed'))
+    assert [tiddler.title for tiddler in tiddlers] == ['one', 'two']
+
+    filters, _ = parse_for_filters('select=bag:other', environ)
+    assert list(recursive_filter(filters, [],
+        indexable=Bag('indexed'))) == []
+
+
+def test_recipe_lookup_uses_index():
+    recipe = Recipe('indexed')
+    recipe.set_recipe([('indexed', ''), ('indexed', 'select=tag:nothing')])
+    recipe.store = store
+    bag = determine_bag_from_recipe(recipe, Tiddler('two'), environ)
+    assert bag.name == 'indexed'
+
+
+def _filter(filter_string, bag_name='indexed', indexed=True):
+    filter_environ = dict(environ)
+    if not indexed:
+        filter_environ['tiddlyweb.config'] = config
+    filters, _ = parse_for_filters(filter_string, filter_environ)
+    tiddlers = store.list_bag_tiddlers(Bag(bag_name))
+    return [tiddler.title for tiddler in recursive_filter(filters, tiddlers,
+        indexable=Bag(bag_name))]
+
+
+def test_index_filter_chains():
+    store.put(Bag('dated'))
+    for number in range(10):
+        tiddler = Tiddler('t%s' % number, 'dated')
+        tiddler.modified = u'2010010%s' % number
+        tiddler.created = u'2009'
+        tiddler.tags = number % 2 and ['odd'] or []
+        store.put(tiddler)
+
+    for filter_string in [
+            'select=modified:>20100104;sort=-modified;limit=3',
+            'select=modified:<20100104;sort=modified',
+            'select=tag:!odd;sort=-title',
+            'select=title:>T5;select=tag:odd;sort=title',
+            'select=modifier:!cdent;sort=title;limit=2,3',
+            'sort=-created;sort=modified;limit=4',
+            'select=bag:!dated',
+            'select=text:hello;sort=-modified;limit=2']:
+        assert (_filter(filter_string, 'dated') ==
+                _filter(filter_string, 'dated', indexed=False))
+
+    assert _filter('select=modified:>20100104;sort=-modified;limit=3',
+            'dated') == ['t9', 't8', 't7']
+
+
+def test_index_filter_consumes_prefix():
+    from tiddlyweb.indexer import index_filter
+    tiddlers, consumed = index_filter(environ, 'dated',
+            [('select', 'tag:odd'), ('sort', '-modified'),
+                ('limit', '2'), ('sort', 'title')])
+    assert consumed == 3
+    assert [tiddler.title for tiddler in tiddlers] == ['t9', 't7']
+
+    tiddlers, consumed = index_filter(environ, 'dated',
+            [('select', 'tag:odd'), ('select', 'text:hello'),
+                ('sort', 'title')])
+    assert consumed == 1
+
+    py.test.raises(FilterIndexRefused, "index_filter(environ, 'dated', "
+            "[('select', 'text:hello'), ('select', 'tag:odd')])")
+
+
+def test_hook_indexes_stored_tiddler():
+    tiddler = Tiddler('t10', 'dated')
+    tiddler.modified = u'20100110'
+    store.put(tiddler)
+    assert tiddler.created == ''
+
+    for filter_string in [
+            'select=created:>20100105;sort=created',
+            'sort=-created;limit=2']:
+        assert (_filter(filter_string, 'dated') ==
+                _filter(filter_string, 'dated', indexed=False))
+    assert _filter('select=created:>20100108', 'dated') == ['t9', 't10']
+
+
+def test_failed_hook_unindexes_bag():
+    index = get_index(index_config)
+
+    def locked(tiddler):
+        raise sqlite3.OperationalError('database is locked')
+
+    assert _query(bag='indexed', tag='beta') == ['one', 'two']
+    index.index_tiddler = locked
+    index.unindex_tiddler = locked
+    try:
+        _put('five', 'indexed', tags=['beta'])
+        assert not index._bag_indexed(index._connection(), 'indexed')
+        assert _query(bag='indexed', tag='beta') == ['five', 'one', 'two']
+
+        store.delete(Tiddler('one', 'indexed'))
+        assert _query(bag='indexed', tag='beta') == ['five', 'two']
+    finally:
+        del index.index_tiddler
+        del index.unindex_tiddler
@@ -0,0 +1,80 @@
+"""
+Test the write locks and atomic writes used by the text store.
+"""
+
+import os
+import threading
+
+from fixtures import reset_textstore, _teststore
+
+from tiddlyweb.model.bag import Bag
+from tiddlyweb.model.tiddler import Tiddler
+from tiddlyweb.util import (write_lock, write_unlock, replace_file,
+        replace_utf8_file, read_utf8_file, LockError, fcntl)
+
+import py.test
+
+LOCKED = os.path.join('store', 'locked')
+
+
+def setup_module(module):
+    reset_textstore()
+    module.store = _teststore()
+    module.store.put(Bag('locks'))
+
+
+def test_lock_waits():
+    write_lock(LOCKED)
+    py.test.raises(LockError, 'write_lock(LOCKED, 0.05)')
+    timer = threading.Timer(0.1, write_unlock, [LOCKED])
+    timer.start()
+    write_lock(LOCKED, 5)
+    timer.join()
+    write_unlock(LOCKED)
+    assert not os.path.exists(os.path.join('store', '.locked'))
+
+
+def test_stale_lock_file():
+    if fcntl is None:
+        py.test.skip('lock files are the lock without fcntl')
+    lock_file = open(os.path.join('store', '.locked'), 'w')
+    lock_file.write('99999')
+    lock_file.close()
+    write_lock(LOCKED)
+    write_unlock(LOCKED)
+
+
+def test_replace_file():
+    filename = os.path.join('store', 'replaced')
+    replace_utf8_file(filename, u'one')
+    replace_utf8_file(filename, u'two \u2603')
+    assert read_utf8_file(filename) == u'two \u2603'
+    assert [name for name in os.listdir('store')
+            if name.startswith('replaced')] == ['replaced']
+
+    replace_file(filename, '\x00\xff')
+    assert open(filename, 'rb').read() == '\x00\xff'
+
+
+def test_concurrent_puts():
+    errors = []
+
+    def put_tiddler(number):
+        try:
+            tiddler = Tiddler('contended', 'locks')
+            tiddler.text = u'text %s' % number
+            store.put(tiddler)
+        except Exception, exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=put_tiddler, args=(number,))
+            for number in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(store.list_tiddler_revisions(
+        Tiddler('contended', 'locks'))) == range(1, 11)
+    assert store.get(Tiddler('contended', 'locks')).revision == 10
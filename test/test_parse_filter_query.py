@@ -37,3 +37,33 @@ def test_parsing():
     
     assert len(tiddlers) == 1
     assert tiddlers[0].title == 'monkey'
+
+
+def test_parsed_filters_cached():
+    from tiddlyweb.filters import FILTER_PARSERS, PARSED_FILTERS
+    string = 'select=tag:cached;sort=title;bogus=1'
+    first_environ = {'first': True}
+    second_environ = {'second': True}
+
+    filters, leftovers = parse_for_filters(string, first_environ)
+    again, again_leftovers = parse_for_filters(string, second_environ)
+    assert again_leftovers == leftovers == 'bogus=1'
+    assert [func for func, _, _ in again] == [func for func, _, _ in filters]
+    assert again[0][2] is second_environ
+    assert filters[0][2] is first_environ
+
+    def bogus_parse(argument):
+        return lambda entities, indexable=False, environ=None: entities
+
+    version = FILTER_PARSERS.version
+    FILTER_PARSERS['bogus'] = bogus_parse
+    try:
+        assert FILTER_PARSERS.version > version
+        filters, leftovers = parse_for_filters(string)
+        assert len(filters) == 3
+        assert leftovers == ''
+    finally:
+        del FILTER_PARSERS['bogus']
+    filters, leftovers = parse_for_filters(string)
+    assert len(filters) == 2
+    assert len(PARSED_FILTERS) > 0
@@ -116,3 +116,22 @@ def test_confirm_attributes():
     for name in ['read', 'write', 'create', 'delete', 'accept', 'manage', 'owner']:
         assert name in attributes
 
+
+def test_user_perms_mask():
+    policy = Policy(read=['R:ADMIN'], write=['R:ADMIN'], create=['jeremy'],
+            delete=['jeremy'])
+    assert policy.user_perms_mask(chris_info) == 1 | 2
+    assert policy.user_perms_mask(jeremy_info) == 4 | 8
+    assert policy.user_perms_mask(guest_info) == 0
+
+def test_policy_changed_after_check():
+    policy = Policy(read=['chris'])
+    assert policy.allows(chris_info, 'read')
+    policy.read.append('jeremy')
+    assert policy.allows(jeremy_info, 'read')
+    policy.read.remove('chris')
+    py.test.raises(ForbiddenError, 'policy.allows(chris_info, "read")')
+    policy.read = ['NONE']
+    py.test.raises(ForbiddenError, 'policy.allows(jeremy_info, "read")')
+    policy.read = None
+    assert policy.allows(jeremy_info, 'read')
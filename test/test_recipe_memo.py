@@ -0,0 +1,107 @@
+"""
+Test memoizing the resolution of recipes.
+"""
+
+from fixtures import reset_textstore
+
+from tiddlyweb.config import config
+from tiddlyweb.control import (get_tiddlers_from_recipe,
+        determine_bag_from_recipe, RECIPE_MEMO)
+from tiddlyweb.model.bag import Bag
+from tiddlyweb.model.recipe import Recipe
+from tiddlyweb.model.tiddler import Tiddler
+from tiddlyweb.store import Store, NoBagError
+
+import py.test
+
+
+def setup_module(module):
+    reset_textstore()
+    RECIPE_MEMO.clear()
+    memo_config = dict(config)
+    memo_config['recipe.memo_size'] = 10
+    module.environ = {'tiddlyweb.config': memo_config,
+            'tiddlyweb.usersign': {'name': 'fnd'}}
+    module.store = Store(config['server_store'][0],
+            config['server_store'][1], environ=module.environ)
+    module.environ['tiddlyweb.store'] = module.store
+    for bag_name in ['memo1', 'memo2', 'memo_fnd']:
+        module.store.put(Bag(bag_name))
+    for title, bag_name, tags in [('one', 'memo1', []),
+            ('two', 'memo1', []), ('two', 'memo2', ['keep']),
+            ('three', 'memo2', []), ('mine', 'memo_fnd', [])]:
+        tiddler = Tiddler(title, bag_name)
+        tiddler.tags = tags
+        module.store.put(tiddler)
+    recipe = Recipe('memo')
+    recipe.set_recipe([('memo1', ''), ('memo2', 'select=tag:keep'),
+        ('memo_{{ user }}', '')])
+    module.store.put(recipe)
+
+
+def _listing_counter():
+    listed = []
+    list_bag_tiddlers = store.storage.list_bag_tiddlers
+
+    def _list_bag_tiddlers(bag):
+        listed.append(bag.name)
+        return list_bag_tiddlers(bag)
+
+    store.storage.list_bag_tiddlers = _list_bag_tiddlers
+    return listed
+
+
+def _titles_and_bags(tiddlers):
+    return sorted((tiddler.title, tiddler.bag) for tiddler in tiddlers)
+
+
+def test_memoized_until_bag_changes():
+    recipe = store.get(Recipe('memo'))
+    listed = _listing_counter()
+    try:
+        expected = [('mine', 'memo_fnd'), ('one', 'memo1'),
+                ('two', 'memo2')]
+        assert _titles_and_bags(
+                get_tiddlers_from_recipe(recipe, environ)) == expected
+        assert listed == ['memo1', 'memo2', 'memo_fnd']
+        assert _titles_and_bags(
+                get_tiddlers_from_recipe(recipe, environ)) == expected
+        assert listed == ['memo1', 'memo2', 'memo_fnd']
+
+        tiddler = Tiddler('four', 'memo2')
+        tiddler.tags = ['keep']
+        store.put(tiddler)
+        assert ('four', 'memo2') in _titles_and_bags(
+                get_tiddlers_from_recipe(recipe, environ))
+        assert len(listed) == 6
+
+        store.delete(tiddler)
+        assert ('four', 'memo2') not in _titles_and_bags(
+                get_tiddlers_from_recipe(recipe, environ))
+    finally:
+        del store.storage.list_bag_tiddlers
+
+
+def test_memo_keyed_by_template():
+    recipe = store.get(Recipe('memo'))
+    other_environ = dict(environ)
+    other_environ['tiddlyweb.usersign'] = {'name': 'cdent'}
+    py.test.raises(NoBagError,
+            'get_tiddlers_from_recipe(recipe, other_environ)')
+    assert ('mine', 'memo_fnd') in _titles_and_bags(
+            get_tiddlers_from_recipe(recipe, environ))
+
+
+def test_determine_bag_from_memo():
+    recipe = store.get(Recipe('memo'))
+    listed = _listing_counter()
+    try:
+        bag = determine_bag_from_recipe(recipe, Tiddler('two'), environ)
+        assert bag.name == 'memo2'
+        bag = determine_bag_from_recipe(recipe, Tiddler('one'), environ)
+        assert bag.name == 'memo1'
+        py.test.raises(NoBagError,
+                "determine_bag_from_recipe(recipe, Tiddler('three'), environ)")
+        assert listed == []
+    finally:
+        del store.storage.list_bag_tiddlers
@@ -0,0 +1,112 @@
+"""
+Test the inverted index search of the text store.
+"""
+
+import os
+
+from fixtures import reset_textstore
+
+from tiddlyweb.config import config
+from tiddlyweb.manage import handle
+from tiddlyweb.model.bag import Bag
+from tiddlyweb.model.tiddler import Tiddler
+from tiddlyweb.searchindex import tokenize
+from tiddlyweb.store import Store
+
+
+def setup_module(module):
+    reset_textstore()
+    module.store = _indexed_store()
+    module.store.put(Bag('alpha'))
+    module.store.put(Bag('beta'))
+
+
+def _indexed_store():
+    store_config = dict(config['server_store'][1])
+    store_config['search_index'] = 'search.db'
+    return Store(config['server_store'][0], store_config,
+            environ={'tiddlyweb.config': config})
+
+
+def _put(title, bag, text, tags=None):
+    tiddler = Tiddler(title, bag)
+    tiddler.text = text
+    tiddler.tags = tags or []
+    store.put(tiddler)
+
+
+def _search(query):
+    return [(tiddler.bag, tiddler.title) for tiddler in store.search(query)]
+
+
+def test_tokenize():
+    assert tokenize(u'The quick, brown-Fox!') == [
+            'the', 'quick', 'brown', 'fox']
+    assert tokenize(None) == []
+
+
+def test_builds_on_first_search():
+    _put('pets', 'alpha', u'I have a cat and a dog.')
+    index = store.storage.search_index
+    index._connection().execute("DELETE FROM meta")
+    index._connection().commit()
+    assert not index.is_built()
+
+    assert _search(u'cat') == [('alpha', 'pets')]
+    assert index.is_built()
+    assert os.path.exists(os.path.join('store', 'search.db'))
+
+
+def test_incremental_and_ranked():
+    _put('cat', 'beta', u'all about them', tags=['animals'])
+    _put('dogs only', 'beta', u'a dog and nothing else')
+
+    assert _search(u'cat') == [('beta', 'cat'), ('alpha', 'pets')]
+    assert _search(u'Cat DOG') == [('alpha', 'pets')]
+    assert _search(u'animals') == [('beta', 'cat')]
+    assert _search(u'giraffe') == []
+    assert _search(u'  ') == []
+
+
+def test_put_replaces_revision():
+    _put('pets', 'alpha', u'Only fish now.')
+
+    assert _search(u'cat') == [('beta', 'cat')]
+    assert _search(u'fish') == [('alpha', 'pets')]
+
+
+def test_delete():
+    store.delete(Tiddler('cat', 'beta'))
+    assert _search(u'cat') == []
+
+    store.delete(Bag('alpha'))
+    assert _search(u'fish') == []
+    assert _search(u'dog') == [('beta', 'dogs only')]
+
+
+def test_reindex_command():
+    index = store.storage.search_index
+    index._connection().execute("DELETE FROM postings")
+    index._connection().commit()
+    assert _search(u'dog') == []
+
+    config['server_store'][1]['search_index'] = 'search.db'
+    try:
+        handle(['', u'reindex'])
+    finally:
+        del config['server_store'][1]['search_index']
+
+    assert _search(u'dog') == [('beta', 'dogs only')]
+
+
+def test_no_index_by_default():
+    plain_store = Store(config['server_store'][0],
+            config['server_store'][1],
+            environ={'tiddlyweb.config': config})
+    assert plain_store.storage.search_index is None
+    titles = [tiddler.title for tiddler in plain_store.search(u'nothing else')]
+    assert titles == ['dogs only']
+
+
+def test_index_shared():
+    assert _indexed_store().storage.search_index is store.storage.search_index
@@ -5,8 +5,13 @@ Test turning a bag into other forms.
 
 import simplejson
 
+import py.test
+
+from tiddlyweb.filters import FilterError
+from tiddlyweb.model.collections import Tiddlers
 from tiddlyweb.serializer import Serializer
 from tiddlyweb.model.bag import Bag
+from tiddlyweb.model.tiddler import Tiddler
 from tiddlyweb.config import config
 
 from fixtures import bagfour, tiddler_collection, reset_textstore
@@ -49,22 +54,41 @@ def test_generated_string_with_revbag():
 
 def test_generated_html():
     html_serializer = Serializer('html')
-    string = html_serializer.list_tiddlers(tiddler_collection)
+    output = html_serializer.list_tiddlers(tiddler_collection)
+    assert not isinstance(output, basestring)
+    string = ''.join(output)
+    assert string.startswith('\n<!DOCTYPE HTML>')
+    assert string.endswith('</ul>\n' + html_serializer.serialization._footer()
+            + '\n')
     assert '<li><a href="/bags/bagfour/tiddlers/TiddlerOne">TiddlerOne</a></li>' in string
 
+def test_generated_html_errors_early():
+    class BrokenTiddlers(Tiddlers):
+        def __iter__(self):
+            raise FilterError('broken')
+            yield
+
+    html_serializer = Serializer('html')
+    py.test.raises(FilterError,
+            'html_serializer.list_tiddlers(BrokenTiddlers())')
+
+    output = list(html_serializer.list_tiddlers(Tiddlers()))
+    assert len(output) == 1
+    assert '<ul id="tiddlers" class="listing">\n\n</ul>' in output[0]
+
 def test_generated_html_with_prefix():
     new_config = config.copy()
     new_config['server_prefix'] = '/salacious'
     environ = {'tiddlyweb.config': new_config}
     html_serializer = Serializer('html', environ)
-    string = html_serializer.list_tiddlers(tiddler_collection)
+    string = ''.join(html_serializer.list_tiddlers(tiddler_collection))
 
     assert '<li><a href="/salacious/bags/bagfour/tiddlers/TiddlerOne">TiddlerOne</a></li>' in string
 
 def test_generated_html_with_revbag():
     html_serializer = Serializer('html')
     tiddler_collection.is_revisions = True
-    string = html_serializer.list_tiddlers(tiddler_collection)
+    string = ''.join(html_serializer.list_tiddlers(tiddler_collection))
 
     assert ('<li><a href="/bags/bagfour/tiddlers/TiddlerTwo/revisions/1">TiddlerTwo:1</a></li>'
             in string or
@@ -100,3 +124,14 @@ def test_html_list():
 
     assert 'href="bags/bag0' in string
     assert 'href="bags/bag1' in string
+
+def test_json_tiddler_list_streams():
+    serializer = Serializer('json', environ={'tiddlyweb.config': config})
+    tiddlers = [Tiddler('one', 'bagfour'), Tiddler('two', 'bagfour')]
+    output = serializer.list_tiddlers(tiddlers)
+
+    assert not isinstance(output, basestring)
+    info = simplejson.loads(''.join(output))
+    assert [tiddler['title'] for tiddler in info] == ['one', 'two']
+
+    assert ''.join(serializer.list_tiddlers([])) == '[]'
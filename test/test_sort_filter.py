@@ -47,3 +47,20 @@ def test_modified_sort():
 def test_modifier_sort():
     py.test.raises(AttributeError, 'sort_by_attribute("blam", tiddlers, reverse=True)')
 
+
+
+def test_sort_limit_matches_sort():
+    from tiddlyweb.filters.sort import sort_limit
+    many = [Tiddler('t%s' % (index % 7)) for index in range(50)]
+    for index, tiddler in enumerate(many):
+        tiddler.fields['position'] = '%s' % index
+    for reverse in [False, True]:
+        for index, count in [(0, 5), (3, 10), (45, 10), (0, 0), (60, 2)]:
+            expected = list(sort_by_attribute('title', many,
+                reverse=reverse))[index:index + count]
+            limited = list(sort_limit('title', many, index, count,
+                reverse=reverse))
+            assert ([tiddler.fields['position'] for tiddler in limited] ==
+                    [tiddler.fields['position'] for tiddler in expected])
+
+    py.test.raises(ValueError, "sort_limit('title', many, -1, 2)")
@@ -0,0 +1,173 @@
+"""
+Test the sqlite store, which keeps entities in an SQLite database.
+"""
+
+import os
+
+from fixtures import reset_textstore
+
+from tiddlyweb.config import config
+from tiddlyweb.control import _filter_tiddlers_from_bag
+from tiddlyweb.filters import parse_for_filters
+from tiddlyweb.model.bag import Bag
+from tiddlyweb.model.policy import Policy
+from tiddlyweb.model.recipe import Recipe
+from tiddlyweb.model.tiddler import Tiddler
+from tiddlyweb.model.user import User
+from tiddlyweb.store import (Store, NoBagError, NoRecipeError,
+        NoTiddlerError, NoUserError)
+
+import py.test
+
+DB_PATH = os.path.join('store', 'tiddlyweb.db')
+
+
+def setup_module(module):
+    reset_textstore()
+    module.store = Store('sqlite', {'db_path': DB_PATH},
+            environ={'tiddlyweb.config': config})
+
+
+def test_database_created():
+    assert os.path.exists(DB_PATH)
+    assert store.storage.database.fts
+
+
+def test_recipe():
+    recipe = Recipe('cooked')
+    recipe.desc = u'a recipe'
+    recipe.set_recipe([('one', ''), ('two', 'select=tag:foo')])
+    recipe.policy = Policy(owner=u'cdent', manage=[u'R:ADMIN'])
+    store.put(recipe)
+
+    stored = store.get(Recipe('cooked'))
+    assert stored.desc == 'a recipe'
+    assert stored.get_recipe() == [['one', ''], ['two', 'select=tag:foo']]
+    assert stored.policy.owner == 'cdent'
+    assert stored.policy.manage == ['R:ADMIN']
+    assert [recipe.name for recipe in store.list_recipes()] == ['cooked']
+
+    store.delete(stored)
+    py.test.raises(NoRecipeError, "store.get(Recipe('cooked'))")
+    py.test.raises(NoRecipeError, "store.delete(Recipe('cooked'))")
+
+
+def test_user():
+    user = User('cdent')
+    user.note = u'a note'
+    user.set_password('cowpig')
+    user.add_role('ADMIN')
+    store.put(user)
+
+    stored = store.get(User('cdent'))
+    assert stored.note == 'a note'
+    assert stored.check_password('cowpig')
+    assert stored.list_roles() == ['ADMIN']
+    assert [user.usersign for user in store.list_users()] == ['cdent']
+
+    store.delete(stored)
+    py.test.raises(NoUserError, "store.get(User('cdent'))")
+
+
+def test_tiddler_revisions():
+    py.test.raises(NoBagError, "store.put(Tiddler('one', 'holder'))")
+    bag = Bag('holder')
+    bag.policy.read = [u'cdent']
+    store.put(bag)
+    assert store.get(Bag('holder')).policy.read == ['cdent']
+
+    for number in range(3):
+        tiddler = Tiddler('one', 'holder')
+        tiddler.text = u'revision %s of one' % number
+        tiddler.modifier = u'writer%s' % number
+        tiddler.tags = [u'tag%s' % number]
+        tiddler.fields[u'number'] = u'%s' % number
+        store.put(tiddler)
+    assert tiddler.revision == 3
+
+    tiddler = store.get(Tiddler('one', 'holder'))
+    assert tiddler.text == 'revision 2 of one'
+    assert tiddler.tags == ['tag2']
+    assert tiddler.fields['number'] == '2'
+    assert tiddler.revision == 3
+    assert tiddler.creator == 'writer0'
+    assert tiddler.modifier == 'writer2'
+
+    assert store.list_tiddler_revisions(Tiddler('one', 'holder')) == [3, 2, 1]
+    revision = Tiddler('one', 'holder')
+    revision.revision = 2
+    assert store.get(revision).text == 'revision 1 of one'
+    revision.revision = 4
+    py.test.raises(NoTiddlerError, 'store.get(revision)')
+
+    header = store.storage.tiddler_get_header(Tiddler('one', 'holder'))
+    assert header.text == ''
+    assert header.tags == ['tag2']
+
+
+def test_binary_tiddler():
+    tiddler = Tiddler('image', 'holder')
+    tiddler.type = 'image/png'
+    tiddler.text = '\x89PNG\x00\xff'
+    store.put(tiddler)
+    stored = store.get(Tiddler('image', 'holder'))
+    assert stored.type == 'image/png'
+    assert stored.text == '\x89PNG\x00\xff'
+
+
+def test_list_and_search():
+    titles = sorted(tiddler.title for tiddler
+            in store.list_bag_tiddlers(Bag('holder')))
+    assert titles == ['image', 'one']
+    assert store.storage.tiddler_exists(Bag('holder'), 'one')
+    assert not store.storage.tiddler_exists(Bag('holder'), 'two')
+    py.test.raises(NoBagError,
+            "list(store.list_bag_tiddlers(Bag('missing')))")
+
+    assert [tiddler.title for tiddler in store.search('of ONE')] == ['one']
+    assert [tiddler.title for tiddler in store.search('tag2')] == ['one']
+    assert list(store.search('revision 1 writer')) == []
+
+
+def test_filter_bag_tiddlers():
+    store.put(Bag('filtered'))
+    for number in range(6):
+        tiddler = Tiddler('f%s' % number, 'filtered')
+        tiddler.modifier = number % 2 and u'odd' or u'even'
+        tiddler.tags = number % 3 and [u'three'] or []
+        tiddler.fields[u'number'] = u'%s' % number
+        store.put(tiddler)
+    environ = {'tiddlyweb.config': config, 'tiddlyweb.store': store}
+    bag = Bag('filtered')
+    bag.store = store
+
+    for filter_string, consumed in [
+            ('select=modifier:odd', 1),
+            ('select=tag:!three;select=number:!0', 2),
+            ('select=field:number;limit=1,2', 2),
+            ('select=text:nothing', 0),
+            ('select=modifier:even;sort=-title', 1)]:
+        filters, _ = parse_for_filters(filter_string, environ)
+        specs = [spec for _, spec, _ in filters]
+        assert store.storage.filter_bag_tiddlers(bag, specs)[1] == consumed
+
+        pushed = _filter_tiddlers_from_bag(bag, filter_string,
+                environ=environ)
+        unpushed = list(store.list_bag_tiddlers(bag))
+        for active_filter, _, filter_environ in filters:
+            unpushed = active_filter(unpushed, False, filter_environ)
+        assert ([tiddler.title for tiddler in pushed]
+                == [tiddler.title for tiddler in unpushed])
+    store.delete(bag)
+
+
+def test_deletes():
+    store.delete(Tiddler('one', 'holder'))
+    py.test.raises(NoTiddlerError, "store.get(Tiddler('one', 'holder'))")
+    py.test.raises(NoTiddlerError, "store.delete(Tiddler('one', 'holder'))")
+    assert list(store.search('one')) == []
+
+    store.delete(Bag('holder'))
+    py.test.raises(NoBagError, "store.get(Bag('holder'))")
+    py.test.raises(NoTiddlerError, "store.get(Tiddler('image', 'holder'))")
+    assert list(store.list_bags()) == []
@@ -0,0 +1,173 @@
+"""
+Test the entity cache in the Store facade.
+"""
+
+from fixtures import reset_textstore
+
+from tiddlyweb.cache import LRUCache
+from tiddlyweb.config import config
+from tiddlyweb.model.bag import Bag
+from tiddlyweb.model.tiddler import Tiddler
+from tiddlyweb.store import Store, NoTiddlerError
+
+import py.test
+
+
+def setup_module(module):
+    reset_textstore()
+    cache_config = dict(config)
+    cache_config['store.cache_size'] = 10
+    module.store = Store(config['server_store'][0],
+            config['server_store'][1],
+            environ={'tiddlyweb.config': cache_config})
+    module.store.cache.clear()
+    module.store.put(Bag('cached'))
+
+
+def test_lru_cache():
+    cache = LRUCache(2)
+    cache.set('one', 1)
+    cache.set('two', 2)
+    assert cache.get('one') == 1
+    cache.set('three', 3)
+    assert 'two' not in cache
+    assert cache.get('one') == 1
+    assert cache.get('three') == 3
+    assert len(cache) == 2
+    assert cache.pop('one') == 1
+    assert cache.get('one') is None
+
+
+def test_no_cache_by_default():
+    uncached = Store(config['server_store'][0], config['server_store'][1],
+            environ={'tiddlyweb.config': config})
+    assert uncached.cache is None
+
+
+def test_cache_shared():
+    cache_config = dict(config)
+    cache_config['store.cache_size'] = 10
+    other = Store(config['server_store'][0], config['server_store'][1],
+            environ={'tiddlyweb.config': cache_config})
+    assert other.cache is store.cache
+
+
+def test_cached_tiddler():
+    tiddler = Tiddler('one', 'cached')
+    tiddler.text = u'first'
+    store.put(tiddler)
+
+    tiddler = store.get(Tiddler('one', 'cached'))
+    assert tiddler.text == 'first'
+    misses = store.cache.misses
+    hits = store.cache.hits
+
+    tiddler = store.get(Tiddler('one', 'cached'))
+    assert tiddler.text == 'first'
+    assert tiddler.revision == 1
+    assert tiddler.store == store
+    assert store.cache.misses == misses
+    assert store.cache.hits == hits + 1
+
+    revision = Tiddler('one', 'cached')
+    revision.revision = 1
+    revision = store.get(revision)
+    assert revision.text == 'first'
+    assert store.cache.hits == hits + 2
+
+
+def test_cached_copies():
+    tiddler = store.get(Tiddler('one', 'cached'))
+    tiddler.text = u'changed locally'
+    tiddler.tags.append(u'local')
+
+    tiddler = store.get(Tiddler('one', 'cached'))
+    assert tiddler.text == 'first'
+    assert tiddler.tags == []
+
+
+def test_cached_keeps_recipe():
+    tiddler = Tiddler('one', 'cached')
+    tiddler.recipe = u'cooked'
+    tiddler = store.get(tiddler)
+    assert tiddler.recipe == 'cooked'
+    assert store.get(Tiddler('one', 'cached')).recipe is None
+
+
+def test_put_invalidates():
+    tiddler = Tiddler('one', 'cached')
+    tiddler.text = u'second'
+    store.put(tiddler)
+
+    tiddler = store.get(Tiddler('one', 'cached'))
+    assert tiddler.text == 'second'
+    assert tiddler.revision == 2
+
+
+def test_put_during_load():
+    key = store.cache.key(Tiddler('one', 'cached'))
+    loaded = store.storage.tiddler_get(Tiddler('one', 'cached'))
+    tiddler = Tiddler('one', 'cached')
+    tiddler.text = u'third'
+    store.put(tiddler)
+    # the load which missed finishes after the put
+    store.cache.set(loaded, None, key)
+
+    tiddler = store.get(Tiddler('one', 'cached'))
+    assert tiddler.text == 'third'
+    assert tiddler.revision == 3
+
+
+def test_delete_invalidates():
+    store.delete(Tiddler('one', 'cached'))
+    py.test.raises(NoTiddlerError, "store.get(Tiddler('one', 'cached'))")
+
+
+def test_bag_delete_invalidates():
+    tiddler = Tiddler('two', 'cached')
+    store.put(tiddler)
+    store.get(Tiddler('two', 'cached'))
+    store.get(Bag('cached'))
+
+    store.delete(Bag('cached'))
+    py.test.raises(NoTiddlerError, "store.get(Tiddler('two', 'cached'))")
+
+
+def test_shared_cache():
+    """
+    Two Stores, standing in for two processes, each with their own
+    in-process cache, sharing a cache.
+    """
+    from tiddlyweb import cache
+
+    shared_config = dict(config)
+    shared_config['store.cache_size'] = 10
+    shared_config['store.shared_cache'] = ['tiddlyweb.sharedcache',
+            {'path': 'store/shared_cache.db'}]
+    first = Store(config['server_store'][0], config['server_store'][1],
+            environ={'tiddlyweb.config': shared_config})
+    first_cache = first.cache
+    cache.CACHES.clear()
+    second = Store(config['server_store'][0], config['server_store'][1],
+            environ={'tiddlyweb.config': shared_config})
+    assert second.cache is not first_cache
+    assert second.cache.shared is not None
+
+    first.put(Bag('shared'))
+    tiddler = Tiddler('one', 'shared')
+    tiddler.text = u'first'
+    first.put(tiddler)
+
+    assert first.get(Tiddler('one', 'shared')).text == 'first'
+    misses = second.cache.misses
+    assert second.get(Tiddler('one', 'shared')).text == 'first'
+    assert second.cache.misses == misses
+
+    tiddler.text = u'second'
+    second.put(tiddler)
+    misses = first_cache.misses
+    assert first.get(Tiddler('one', 'shared')).text == 'second'
+    assert first_cache.misses == misses + 1
+
+    first.delete(Bag('shared'))
+    py.test.raises(NoTiddlerError, "second.get(Tiddler('one', 'shared'))")
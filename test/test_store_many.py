@@ -0,0 +1,161 @@
+"""
+Test getting, putting and deleting many entities at once.
+"""
+
+import os
+
+import simplejson
+
+from fixtures import reset_textstore, _teststore
+
+from tiddlyweb.config import config
+from tiddlyweb.model.bag import Bag
+from tiddlyweb.model.collections import Tiddlers
+from tiddlyweb.model.recipe import Recipe
+from tiddlyweb.model.tiddler import Tiddler
+from tiddlyweb.store import (Store, StoreError, NoTiddlerError, HOOKS,
+        get_entities)
+
+MANIFEST_PATH = os.path.join('store', 'bags', 'many', 'manifest')
+
+
+def setup_module(module):
+    reset_textstore()
+    module.store = _teststore()
+    module.store.put(Bag('many'))
+
+
+def _tiddler(title, text):
+    tiddler = Tiddler(title, 'many')
+    tiddler.text = text
+    return tiddler
+
+
+def test_put_many():
+    put_tiddlers = []
+
+    def _hook(store, tiddler):
+        put_tiddlers.append(tiddler.title)
+
+    HOOKS['tiddler']['put'].append(_hook)
+    try:
+        store.put_many([_tiddler(u'one', u'1'), _tiddler(u'two', u'2'),
+            Recipe('manyrecipe'), _tiddler(u'one', u'1 again')])
+    finally:
+        HOOKS['tiddler']['put'].remove(_hook)
+
+    assert sorted(put_tiddlers) == ['one', 'one', 'two']
+    assert store.get(Recipe('manyrecipe')).name == 'manyrecipe'
+    manifest = simplejson.loads(open(MANIFEST_PATH).read())
+    assert sorted(manifest.keys()) == ['one', 'two']
+    assert manifest['one']['revision'] == 2
+
+
+def test_get_many():
+    things = [Tiddler(u'one', 'many'), Tiddler(u'missing', 'many'),
+            Bag('many'), Tiddler(u'two', 'many')]
+    results = list(store.get_many(things))
+
+    assert len(results) == 4
+    assert results[0].text == '1 again'
+    assert results[0].revision == 2
+    assert results[0].store == store
+    assert isinstance(results[1], NoTiddlerError)
+    assert results[2].name == 'many'
+    assert results[3].text == '2'
+    assert results[3].created == results[3].modified
+
+
+def test_get_many_revision():
+    tiddler = Tiddler(u'one', 'many')
+    tiddler.revision = 1
+    tiddler = list(store.get_many([tiddler]))[0]
+    assert tiddler.text == '1'
+
+
+def test_get_many_without_manifest_created():
+    manifest = simplejson.loads(open(MANIFEST_PATH).read())
+    del manifest['two']['created']
+    open(MANIFEST_PATH, 'w').write(simplejson.dumps(manifest))
+
+    tiddler = list(store.get_many([Tiddler(u'two', 'many')]))[0]
+    assert tiddler.text == '2'
+    assert tiddler.created
+
+
+def test_get_many_cached():
+    cache_config = dict(config)
+    cache_config['store.cache_size'] = 10
+    cached_store = Store(config['server_store'][0],
+            config['server_store'][1],
+            environ={'tiddlyweb.config': cache_config})
+    cached_store.cache.clear()
+    cached_store.get(Tiddler(u'two', 'many'))
+
+    results = list(cached_store.get_many([Tiddler(u'one', 'many'),
+        Tiddler(u'two', 'many'), Tiddler(u'gone', 'many')]))
+    assert [result.title for result in results[:2]] == ['one', 'two']
+    assert isinstance(results[2], StoreError)
+    assert cached_store.cache.hits == 1
+
+
+def test_get_entities():
+    loaded = _tiddler(u'loaded', u'already')
+    loaded.store = store
+    entities = [Tiddler(u'one', 'many'), loaded, Tiddler(u'missing', 'many'),
+            Tiddler(u'bagless')]
+    results = list(get_entities(entities, store))
+
+    assert results[0].text == '1 again'
+    assert results[1] is loaded
+    assert results[2] is entities[2]
+    assert results[3] is entities[3]
+
+
+def test_tiddlers_add_many():
+    tiddlers = Tiddlers(store=store)
+    tiddlers.add_many([Tiddler(u'one', 'many'), Tiddler(u'missing', 'many'),
+        Tiddler(u'two', 'many')])
+
+    assert [tiddler.title for tiddler in tiddlers] == ['one', 'two']
+    assert [tiddler.text for tiddler in tiddlers] == ['1 again', '2']
+
+
+def test_put_bag_without_manifest():
+    os.unlink(MANIFEST_PATH)
+    bag = Bag('many')
+    bag.desc = u'changed'
+    store.put(bag)
+
+    titles = [tiddler.title for tiddler in store.list_bag_tiddlers(bag)]
+    assert sorted(titles) == ['one', 'two']
+    manifest = simplejson.loads(open(MANIFEST_PATH).read())
+    assert manifest['one']['revision'] == 2
+
+
+def test_delete_many():
+    store.delete_many([Tiddler(u'one', 'many'), Tiddler(u'two', 'many')])
+
+    results = list(store.get_many([Tiddler(u'one', 'many'),
+        Tiddler(u'two', 'many')]))
+    assert isinstance(results[0], NoTiddlerError)
+    assert isinstance(results[1], NoTiddlerError)
+    assert simplejson.loads(open(MANIFEST_PATH).read()) == {}
+
+
+def test_stale_manifest_updates():
+    storage = store.storage
+    first = storage._write_tiddler(_tiddler(u'raced', u'first'))
+    storage._write_tiddler(_tiddler(u'raced', u'second'))
+    # the older put updates the manifest last
+    storage._update_manifest('many', {u'raced': first})
+    manifest = simplejson.loads(open(MANIFEST_PATH).read())
+    assert manifest['raced']['revision'] == 2
+
+    entry = storage._write_tiddler(_tiddler(u'raced', u'third'))
+    storage._remove_tiddler(Tiddler(u'raced', 'many'))
+    storage._update_manifest('many', {u'raced': None})
+    # the put, made before the delete, updates the manifest last
+    storage._update_manifest('many', {u'raced': entry})
+    manifest = simplejson.loads(open(MANIFEST_PATH).read())
+    assert u'raced' not in manifest
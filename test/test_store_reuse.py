@@ -0,0 +1,41 @@
+"""
+Test reusing the Store across requests in StoreSet.
+"""
+
+from tiddlyweb.config import config
+from tiddlyweb.web.wsgi import StoreSet
+
+
+def _application(environ, start_response):
+    return [environ['tiddlyweb.store']]
+
+
+def _request(app, request_config):
+    environ = {'tiddlyweb.config': request_config}
+    store = app(environ, None)[0]
+    return store, environ
+
+
+def test_store_per_request():
+    app = StoreSet(_application)
+    first, _ = _request(app, config)
+    second, _ = _request(app, config)
+    assert first is not second
+
+
+def test_store_reuse():
+    reuse_config = dict(config)
+    reuse_config['store.reuse'] = True
+    app = StoreSet(_application)
+
+    first, first_environ = _request(app, reuse_config)
+    second, second_environ = _request(app, reuse_config)
+    assert first is second
+    assert second.storage is first.storage
+    assert second.environ is second_environ
+    assert second.storage.environ is second_environ
+
+    reuse_config['server_store'] = ['text', {'store_root': 'store2'}]
+    third, _ = _request(app, reuse_config)
+    assert third is not second
+    assert third.config == {'store_root': 'store2'}
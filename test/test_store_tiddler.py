@@ -199,3 +199,11 @@ def test_put_and_get_dotted_file():
     assert tiddler2.tags == ['foo']
 
     assert len(tiddlers1) == len(tiddlers0) + 1
+
+
+def test_tiddler_exists():
+    assert store.tiddler_exists(Bag('bagone'), '.profile')
+    assert not store.tiddler_exists(Bag('bagone'), 'not there')
+    assert not store.tiddler_exists(Bag('bagone'), '../nastyone')
+    py.test.raises(NoBagError,
+            "store.tiddler_exists(Bag('not a bag'), '.profile')")
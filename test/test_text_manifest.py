@@ -0,0 +1,112 @@
+"""
+Test the per-bag tiddler manifest kept by the text store.
+"""
+
+import os
+
+import simplejson
+
+from fixtures import reset_textstore, _teststore
+
+from tiddlyweb.manage import handle
+from tiddlyweb.model.bag import Bag
+from tiddlyweb.model.tiddler import Tiddler
+from tiddlyweb.store import NoBagError
+
+import py.test
+
+MANIFEST_PATH = os.path.join('store', 'bags', 'manifested', 'manifest')
+
+
+def setup_module(module):
+    reset_textstore()
+    module.store = _teststore()
+    module.store.put(Bag('manifested'))
+
+
+def _read_manifest():
+    return simplejson.loads(open(MANIFEST_PATH).read())
+
+
+def test_new_bag_has_manifest():
+    assert os.path.exists(MANIFEST_PATH)
+    assert _read_manifest() == {}
+
+
+def test_put_updates_manifest():
+    tiddler = Tiddler('one', 'manifested')
+    tiddler.tags = ['alpha', 'beta']
+    tiddler.modified = '20130101000000'
+    store.put(tiddler)
+    store.put(tiddler)
+
+    manifest = _read_manifest()
+    assert manifest.keys() == ['one']
+    assert manifest['one']['revision'] == 2
+    assert manifest['one']['modified'] == '20130101000000'
+    assert sorted(manifest['one']['tags']) == ['alpha', 'beta']
+
+
+def test_list_uses_manifest():
+    store.put(Tiddler('two', 'manifested'))
+    titles = sorted(tiddler.title for tiddler
+            in store.list_bag_tiddlers(Bag('manifested')))
+    assert titles == ['one', 'two']
+
+    manifest = _read_manifest()
+    manifest['ghost'] = {'revision': 1, 'modified': '', 'tags': []}
+    open(MANIFEST_PATH, 'w').write(simplejson.dumps(manifest))
+
+    titles = sorted(tiddler.title for tiddler
+            in store.list_bag_tiddlers(Bag('manifested')))
+    assert titles == ['ghost', 'one', 'two']
+
+
+def test_delete_updates_manifest():
+    store.delete(Tiddler('two', 'manifested'))
+    assert 'two' not in _read_manifest()
+
+
+def test_rebuild_manifest_command():
+    handle(['', u'remanifest', u'manifested'])
+    manifest = _read_manifest()
+    assert sorted(manifest.keys()) == ['one']
+    assert manifest['one']['revision'] == 2
+
+
+def test_missing_manifest():
+    os.unlink(MANIFEST_PATH)
+    titles = [tiddler.title for tiddler
+            in store.list_bag_tiddlers(Bag('manifested'))]
+    assert titles == ['one']
+
+    store.put(Tiddler('three', 'manifested'))
+    assert sorted(_read_manifest().keys()) == ['one', 'three']
+
+
+def test_rebuild_missing_bag():
+    py.test.raises(NoBagError,
+            "store.storage.rebuild_manifest(Bag('nonexistent'))")
+
+
+def test_list_bag_tiddler_metadata():
+    from tiddlyweb.model.collections import Tiddlers
+
+    references = list(store.list_bag_tiddler_metadata(Bag('manifested')))
+    assert sorted(tiddler.title for tiddler in references) == [
+            'one', 'three']
+    for tiddler in references:
+        assert tiddler.store is None
+        assert tiddler.revision
+
+    loaded = Tiddlers(store=store)
+    loaded.add_many(store.list_bag_tiddlers(Bag('manifested')))
+    referenced = Tiddlers(store=store)
+    referenced.add_references(references)
+    assert referenced.hexdigest() == loaded.hexdigest()
+    assert referenced.modified == loaded.modified
+    assert ([tiddler.text for tiddler in referenced]
+            == [tiddler.text for tiddler in loaded])
+
+    py.test.raises(NoBagError,
+            "store.list_bag_tiddler_metadata(Bag('nonexistent'))")
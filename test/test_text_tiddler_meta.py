@@ -0,0 +1,68 @@
+"""
+Test the revision metadata the text store keeps for each tiddler.
+"""
+
+import os
+
+import simplejson
+
+from fixtures import reset_textstore, _teststore
+
+from tiddlyweb.model.bag import Bag
+from tiddlyweb.model.tiddler import Tiddler
+
+META_PATH = os.path.join('store', 'bags', 'metabag', 'tiddlers', 'alpha',
+        'meta')
+
+
+def setup_module(module):
+    reset_textstore()
+    module.store = _teststore()
+    module.store.put(Bag('metabag'))
+
+
+def _put_revisions(count):
+    for numeral in range(count):
+        tiddler = Tiddler('alpha', 'metabag')
+        tiddler.modifier = u'author%s' % numeral
+        tiddler.modified = u'2013010100000%s' % numeral
+        tiddler.text = u'revision %s' % numeral
+        store.put(tiddler)
+
+
+def test_put_writes_meta():
+    _put_revisions(3)
+    meta = simplejson.loads(open(META_PATH).read())
+    assert meta['head'] == 3
+    assert meta['first'] == 1
+    assert meta['creator'] == 'author0'
+    assert meta['created'] == '20130101000000'
+
+
+def test_get_uses_meta():
+    tiddler = store.get(Tiddler('alpha', 'metabag'))
+    assert tiddler.revision == 3
+    assert tiddler.text == 'revision 2'
+    assert tiddler.creator == 'author0'
+    assert tiddler.created == '20130101000000'
+
+    tiddler = Tiddler('alpha', 'metabag')
+    tiddler.revision = 2
+    tiddler = store.get(tiddler)
+    assert tiddler.text == 'revision 1'
+    assert tiddler.created == '20130101000000'
+
+
+def test_missing_meta():
+    os.unlink(META_PATH)
+    tiddler = store.get(Tiddler('alpha', 'metabag'))
+    assert tiddler.revision == 3
+    assert tiddler.creator == 'author0'
+
+    _put_revisions(1)
+    meta = simplejson.loads(open(META_PATH).read())
+    assert meta['head'] == 4
+    assert meta['first'] == 1
+    assert meta['creator'] == 'author0'
+    assert store.list_tiddler_revisions(Tiddler('alpha', 'metabag')) == [
+            4, 3, 2, 1]
@@ -0,0 +1,191 @@
+"""
+Test the textlog store, which keeps the revisions of a tiddler in an
+append-only log.
+"""
+
+import os
+import threading
+
+from fixtures import reset_textstore, _teststore
+
+from tiddlyweb.config import config
+from tiddlyweb.manage import handle
+from tiddlyweb.model.bag import Bag
+from tiddlyweb.model.tiddler import Tiddler
+from tiddlyweb.store import Store, NoTiddlerError
+import tiddlyweb.stores.textlog
+from tiddlyweb.stores.textlog import INDEX_ENTRY
+from tiddlyweb.util import write_lock, write_unlock
+
+import py.test
+
+TIDDLERS_DIR = os.path.join('store', 'bags', 'logged', 'tiddlers')
+
+
+def setup_module(module):
+    reset_textstore()
+    module.store = Store('textlog', config['server_store'][1],
+            environ={'tiddlyweb.config': config})
+    module.store.put(Bag('logged'))
+
+
+def test_put_and_get():
+    for number in range(3):
+        tiddler = Tiddler('one', 'logged')
+        tiddler.text = u'revision %s\n\nof one' % number
+        tiddler.modifier = u'writer%s' % number
+        tiddler.tags = [u'tag%s' % number]
+        store.put(tiddler)
+    assert tiddler.revision == 3
+    assert sorted(os.listdir(TIDDLERS_DIR)) == ['one.idx', 'one.log']
+
+    tiddler = store.get(Tiddler('one', 'logged'))
+    assert tiddler.text == 'revision 2\n\nof one'
+    assert tiddler.tags == ['tag2']
+    assert tiddler.revision == 3
+    assert tiddler.creator == 'writer0'
+    assert tiddler.modifier == 'writer2'
+
+    assert store.list_tiddler_revisions(Tiddler('one', 'logged')) == [3, 2, 1]
+    revision = Tiddler('one', 'logged')
+    revision.revision = 2
+    assert store.get(revision).text == 'revision 1\n\nof one'
+    revision.revision = 4
+    py.test.raises(NoTiddlerError, 'store.get(revision)')
+
+    header = store.storage.tiddler_get_header(Tiddler('one', 'logged'))
+    assert header.text == ''
+    assert header.tags == ['tag2']
+
+
+def test_list_and_search():
+    titles = [tiddler.title for tiddler
+            in store.list_bag_tiddlers(Bag('logged'))]
+    assert titles == ['one']
+    assert store.storage.tiddler_exists(Bag('logged'), 'one')
+    assert not store.storage.tiddler_exists(Bag('logged'), 'two')
+    assert [tiddler.title for tiddler in store.search('of one')] == ['one']
+    assert list(store.search('revision 1')) == []
+
+
+def test_missing_index_rebuilt():
+    os.unlink(os.path.join(TIDDLERS_DIR, 'one.idx'))
+    tiddler = store.get(Tiddler('one', 'logged'))
+    assert tiddler.revision == 3
+    assert tiddler.creator == 'writer0'
+    assert os.path.exists(os.path.join(TIDDLERS_DIR, 'one.idx'))
+
+
+def test_index_rebuilt_under_lock():
+    index_filename = os.path.join(TIDDLERS_DIR, 'one.idx')
+    lock_filename = os.path.join(TIDDLERS_DIR, 'one.lock')
+    index = open(index_filename, 'rb').read()
+    os.unlink(index_filename)
+
+    def write_index():
+        # a writer holding the lock gets its index in first
+        index_file = open(index_filename, 'wb')
+        index_file.write(index[:2 * INDEX_ENTRY.size])
+        index_file.close()
+        write_unlock(lock_filename)
+
+    write_lock(lock_filename)
+    timer = threading.Timer(0.1, write_index)
+    timer.start()
+    tiddler = store.get(Tiddler('one', 'logged'))
+    timer.join()
+    assert tiddler.revision == 2
+    assert open(index_filename, 'rb').read() == index[:2 * INDEX_ENTRY.size]
+
+    os.unlink(index_filename)
+    assert store.get(Tiddler('one', 'logged')).revision == 3
+    assert sorted(os.listdir(TIDDLERS_DIR)) == ['one.idx', 'one.log']
+
+
+def test_broken_log():
+    tiddler = Tiddler('broken', 'logged')
+    tiddler.text = u'broken text'
+    store.put(tiddler)
+    log_filename = os.path.join(TIDDLERS_DIR, 'broken.log')
+    log = open(log_filename, 'rb+')
+    log.truncate(os.path.getsize(log_filename) - 5)
+    log.close()
+
+    py.test.raises(NoTiddlerError, "store.get(Tiddler('broken', 'logged'))")
+    loaded = list(store.storage.get_many([Tiddler('broken', 'logged'),
+        Tiddler('one', 'logged')]))
+    assert isinstance(loaded[0], NoTiddlerError)
+    assert loaded[1].text == 'revision 2\n\nof one'
+    store.delete(Tiddler('broken', 'logged'))
+
+
+def test_delete():
+    store.delete(Tiddler('one', 'logged'))
+    assert os.listdir(TIDDLERS_DIR) == []
+    py.test.raises(NoTiddlerError, "store.get(Tiddler('one', 'logged'))")
+    py.test.raises(NoTiddlerError, "store.delete(Tiddler('one', 'logged'))")
+
+
+def test_convert_command():
+    text_store = _teststore()
+    text_store.put(Bag('converted'))
+    for number in range(2):
+        tiddler = Tiddler('old', 'converted')
+        tiddler.text = u'old text %s' % number
+        tiddler.modifier = u'writer%s' % number
+        text_store.put(tiddler)
+
+    original_store = config['server_store']
+    config['server_store'] = ['textlog', original_store[1]]
+    try:
+        handle(['', u'convertlog', u'converted'])
+    finally:
+        config['server_store'] = original_store
+
+    assert sorted(os.listdir(os.path.join('store', 'bags', 'converted',
+        'tiddlers'))) == ['old.idx', 'old.log']
+    tiddler = store.get(Tiddler('old', 'converted'))
+    assert tiddler.text == 'old text 1'
+    assert tiddler.revision == 2
+    assert tiddler.creator == 'writer0'
+    store.put(tiddler)
+    assert store.list_tiddler_revisions(tiddler) == [3, 2, 1]
+
+
+def test_convert_interrupted():
+    text_store = _teststore()
+    text_store.put(Bag('interrupted'))
+    for title in ['first', 'second']:
+        for number in range(2):
+            tiddler = Tiddler(title, 'interrupted')
+            tiddler.text = u'%s text %s' % (title, number)
+            text_store.put(tiddler)
+    tiddlers_dir = os.path.join('store', 'bags', 'interrupted', 'tiddlers')
+    # the leftovers of a log being written
+    junk = open(os.path.join(tiddlers_dir, 'second.log#convert'), 'w')
+    junk.write('junk')
+    junk.close()
+
+    shutil = tiddlyweb.stores.textlog.shutil
+    original_rmtree = shutil.rmtree
+
+    def rmtree(path):
+        shutil.rmtree = original_rmtree
+        raise OSError('interrupted')
+    shutil.rmtree = rmtree
+    try:
+        py.test.raises(OSError,
+                "store.storage.convert_bag(Bag('interrupted'))")
+    finally:
+        shutil.rmtree = original_rmtree
+
+    assert store.storage.convert_bag(Bag('interrupted')) == 1
+    assert sorted(os.listdir(tiddlers_dir)) == ['first.idx', 'first.log',
+            'second.idx', 'second.log']
+    for title in ['first', 'second']:
+        tiddler = Tiddler(title, 'interrupted')
+        assert store.list_tiddler_revisions(tiddler) == [2, 1]
+        assert store.get(tiddler).text == '%s text 1' % title
+        log = open(os.path.join(tiddlers_dir, '%s.log' % title)).read()
+        assert log.startswith('1 ')
+        assert log.count('text 0') == 1
@@ -0,0 +1,100 @@
+"""
+Test getting tiddlers without their text, for filtering
+and collections.
+"""
+
+from fixtures import reset_textstore
+
+from tiddlyweb.config import config
+from tiddlyweb.control import filter_tiddlers
+from tiddlyweb.model.bag import Bag
+from tiddlyweb.model.collections import Tiddlers
+from tiddlyweb.model.tiddler import Tiddler
+from tiddlyweb.store import Store, HOOKS, NoTiddlerError
+
+import py.test
+
+
+def setup_module(module):
+    reset_textstore()
+    header_config = dict(config)
+    header_config['collections.use_memory'] = False
+    module.environ = {'tiddlyweb.config': header_config}
+    module.store = Store(config['server_store'][0],
+            config['server_store'][1], environ=module.environ)
+    module.environ['tiddlyweb.store'] = module.store
+    module.store.put(Bag('headers'))
+    tiddler = Tiddler('big', 'headers')
+    tiddler.text = u'line\n\nanother line\n' * 1000
+    tiddler.tags = [u'alpha', u'two words']
+    tiddler.fields[u'odd'] = u'before\u2028after'
+    module.store.put(tiddler)
+    tiddler = Tiddler('small', 'headers')
+    tiddler.text = u'small'
+    module.store.put(tiddler)
+
+
+def test_tiddler_get_header():
+    full = store.storage.tiddler_get(Tiddler('big', 'headers'))
+    header = store.storage.tiddler_get_header(Tiddler('big', 'headers'))
+    assert header.text == ''
+    assert full.text.startswith('line')
+    for attribute in ['title', 'bag', 'tags', 'fields', 'modified',
+            'modifier', 'created', 'creator', 'revision']:
+        assert getattr(header, attribute) == getattr(full, attribute)
+
+    py.test.raises(NoTiddlerError,
+            "store.storage.tiddler_get_header(Tiddler('missing', 'headers'))")
+
+
+def test_get_many_without_text():
+    tiddlers = list(store.get_many([Tiddler('big', 'headers'),
+        Tiddler('small', 'headers'), Bag('headers')], text=False))
+    assert tiddlers[0].text == ''
+    assert sorted(tiddlers[0].tags) == ['alpha', 'two words']
+    assert tiddlers[1].title == 'small'
+    assert tiddlers[2].name == 'headers'
+
+
+def test_get_hooks_get_text():
+    def hook(store, tiddler):
+        pass
+
+    HOOKS['tiddler']['get'].append(hook)
+    try:
+        tiddler = list(store.get_many([Tiddler('big', 'headers')],
+            text=False))[0]
+        assert tiddler.text.startswith('line')
+    finally:
+        HOOKS['tiddler']['get'].remove(hook)
+
+
+def test_filters_read_headers():
+    got_headers = []
+    get_many_headers = store.storage.get_many_headers
+
+    def _get_many_headers(things):
+        for thing in get_many_headers(things):
+            got_headers.append(thing.title)
+            yield thing
+
+    store.storage.get_many_headers = _get_many_headers
+    try:
+        tiddlers = [Tiddler('big', 'headers'), Tiddler('small', 'headers')]
+        selected = list(filter_tiddlers(tiddlers, 'select=tag:alpha',
+            environ))
+        assert [tiddler.title for tiddler in selected] == ['big']
+        assert got_headers == ['big', 'small']
+
+        del got_headers[:]
+        selected = list(filter_tiddlers(tiddlers, 'select=text:small',
+            environ))
+        assert [tiddler.title for tiddler in selected] == ['small']
+        assert got_headers == []
+
+        collection = Tiddlers(store=store)
+        collection.add_many(tiddlers)
+        assert got_headers == ['big', 'small']
+        assert [tiddler.text for tiddler in collection][1] == 'small'
+    finally:
+        del store.storage.get_many_headers